@@ -1,12 +1,34 @@
 import sys
 import json
+import concurrent.futures
+import hashlib
 import re
 import requests
-import subprocess
+import tempfile
+from requests.adapters import HTTPAdapter
 from requests.auth import HTTPBasicAuth
+from urllib3.util.retry import Retry
 from datetime import datetime
+from pathlib import Path
 import os
 
+# orjson parses bytes directly and is several times faster than the stdlib for
+# large compare payloads; fall back to json when it isn't installed
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:
+    _json_loads = json.loads
+
+# ijson (C/YAJL backend) lets compare pages be parsed incrementally as they
+# download; without it each page is buffered and parsed whole
+try:
+    import ijson
+    _JSON_ERRORS = (json.JSONDecodeError, ijson.JSONError)
+except ImportError:
+    ijson = None
+    _JSON_ERRORS = (json.JSONDecodeError,)
+
 # ========================
 # Load configuration from JSON file
 # ========================
@@ -31,117 +53,308 @@ DEFINITION_ID = config.get("DEFINITION_ID")
 BRANCH = config.get("BRANCH")
 AZURE_PAT = config.get("AZURE_PAT")
 GITHUB_REPO = config.get("GITHUB_REPO")
+GITHUB_TOKEN = config.get("GITHUB_TOKEN") or os.environ.get("GITHUB_TOKEN")
 BUILD_NUMBERS = config.get("BUILD_NUMBERS", [])
 
+# ========================
+# Pre-compiled patterns
+# ========================
+
+# Possessive quantifiers (Python 3.11+) stop the engine retrying shorter letter/digit
+# runs once a run is consumed; the \b anchors make both forms match identically
+if sys.version_info >= (3, 11):
+    _TICKET_RE = re.compile(r"\b[A-Z]{3,5}+-\d{2,6}+\b")
+else:
+    _TICKET_RE = re.compile(r"\b[A-Z]{3,5}-\d{2,6}\b")
+_PR_RE = re.compile(r"#(\d+)")
+
+# ========================
+# On-disk caches
+# ========================
+
+CACHE_DIR = Path.home() / ".cache" / "bitty"
+AZURE_BUILD_CACHE = CACHE_DIR / "azure_builds.json"
+GITHUB_COMPARE_CACHE_DIR = CACHE_DIR / "compare"
+# Bump when the cached commit dict layout changes to invalidate old entries
+GITHUB_COMPARE_CACHE_SCHEMA_VERSION = 2
+
+# ========================
+# Shared HTTP session (connection pooling + keep-alive)
+# ========================
+
+_SESSION = requests.Session()
+_SESSION.mount("https://", HTTPAdapter(
+    pool_connections=4,
+    pool_maxsize=4,
+    max_retries=Retry(total=2, backoff_factor=0.3, status_forcelist=[502, 503, 504])
+))
+
 # ========================
 # Functions
 # ========================
 
-def get_azure_build_commit(org, project, definition_id, branch, build_number, pat):
-    """Fetch commit SHA from Azure DevOps for a succeeded build."""
+def _load_cache(path):
+    """Load a JSON cache file, returning an empty dict if it is missing or unreadable."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable cache {path}: {e}")
+        return {}
+
+
+def _save_cache(path, data):
+    """Atomically write a JSON cache file (temp file + os.replace)."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError as e:
+        print(f"⚠️ Could not write cache {path}: {e}")
+
+
+def _fetch_azure_builds(org, project, definition_id, branch, build_number_filter, pat):
+    """Query Azure DevOps for succeeded builds and index them by build number (None on error)."""
     url = f"https://dev.azure.com/{org}/{project}/_apis/build/builds"
     params = {
         "definitions": definition_id,
         "branchName": branch,
-        "buildNumber": build_number,
-        "api-version": "7.2-preview.7"
+        "buildNumber": build_number_filter,
+        "resultFilter": "succeeded",
+        "api-version": "7.1"
     }
 
-    print(f"Fetching build {build_number} from Azure DevOps {org}/{project}...")
+    print(f"Fetching build(s) {build_number_filter} from Azure DevOps {org}/{project}...")
 
     try:
-        response = requests.get(url, auth=HTTPBasicAuth('', pat), params=params, timeout=30)
+        response = _SESSION.get(url, auth=HTTPBasicAuth('', pat), params=params, timeout=30)
         response.raise_for_status()
     except requests.exceptions.RequestException as e:
-        print(f"❌ Error fetching build {build_number}: {e}")
+        print(f"❌ Error fetching build(s) {build_number_filter}: {e}")
         return None
 
     try:
-        data = response.json()
+        data = _json_loads(response.content)
     except json.JSONDecodeError as e:
-        print(f"⚠️ Invalid JSON for build {build_number}: {e}")
+        print(f"⚠️ Invalid JSON for build(s) {build_number_filter}: {e}")
         return None
 
-    if data.get("count", 0) == 0:
-        print(f"❌ No build found for {build_number}")
-        return None
+    # Builds are returned newest first; keep the first match per build number
+    builds = {}
+    for b in data.get("value", []):
+        builds.setdefault(b.get("buildNumber"), b)
+    return builds
+
+
+def get_azure_build_commits(org, project, definition_id, branch, build_numbers, pat):
+    """Fetch commit SHAs (None if unresolved) from Azure DevOps for succeeded builds, in input order."""
+    # A completed build's source SHA never changes, so cached entries never expire
+    cache = _load_cache(AZURE_BUILD_CACHE)
+    cache_keys = {b: f"{org}|{project}|{definition_id}|{b}" for b in build_numbers}
+
+    # dict.fromkeys de-duplicates while keeping order (build1 may equal build2)
+    to_fetch = list(dict.fromkeys(b for b in build_numbers if cache_keys[b] not in cache))
+    builds = {}
+    if to_fetch:
+        builds = _fetch_azure_builds(org, project, definition_id, branch, ",".join(to_fetch), pat)
+
+    # Retry anything a multi-build batch did not resolve individually, in parallel. A single
+    # build was already queried on its own, and an HTTP/JSON error (None) would just repeat.
+    missing = []
+    if builds is None:
+        builds = {}
+    elif len(to_fetch) > 1:
+        missing = [b for b in to_fetch if b not in builds]
+    if missing:
+        with concurrent.futures.ThreadPoolExecutor(max_workers=len(missing)) as ex:
+            futures = [
+                ex.submit(_fetch_azure_builds, org, project, definition_id, branch, b, pat)
+                for b in missing
+            ]
+            for future in futures:
+                builds.update(future.result() or {})
 
-    build = next((b for b in data["value"] if b.get("result") == "succeeded"), None)
-    if not build:
-        print(f"⚠️ Build {build_number} not succeeded.")
-        return None
+    commit_shas = []
+    cache_updated = False
+    for build_number in build_numbers:
+        cached_sha = cache.get(cache_keys[build_number])
+        if cached_sha:
+            print(f"✅ Build {build_number} → Commit: {cached_sha} (cached)")
+            commit_shas.append(cached_sha)
+            continue
 
-    commit_sha = build.get("sourceVersion")
-    if not commit_sha:
-        print(f"❌ No source version found for build {build_number}")
-        return None
+        build = builds.get(build_number)
+        if not build:
+            print(f"❌ No succeeded build found for {build_number}")
+            commit_shas.append(None)
+            continue
 
-    print(f"✅ Build {build_number} → Commit: {commit_sha}")
-    return commit_sha
+        commit_sha = build.get("sourceVersion")
+        if not commit_sha:
+            print(f"❌ No source version found for build {build_number}")
+            commit_shas.append(None)
+            continue
 
+        print(f"✅ Build {build_number} → Commit: {commit_sha}")
+        commit_shas.append(commit_sha)
+        cache[cache_keys[build_number]] = commit_sha
+        cache_updated = True
+
+    if cache_updated:
+        _save_cache(AZURE_BUILD_CACHE, cache)
+
+    return commit_shas
+
+
+def _iter_json_items(response, prefix):
+    """Yield items under prefix from a streamed response as its chunks arrive."""
+    # iter_content (not response.raw) so gzip is decoded and dropped connections or
+    # read timeouts surface as requests exceptions
+    items = ijson.sendable_list()
+    coro = ijson.items_coro(items, prefix)
+    for chunk in response.iter_content(chunk_size=64 * 1024):
+        coro.send(chunk)
+        yield from items
+        del items[:]
+    coro.close()
+    yield from items
+
+
+def _fetch_github_commits(repo, sha1, sha2):
+    """Yield parsed commits between two SHAs from the GitHub compare API, page by page."""
+    # Errors are raised rather than printed: earlier pages may already be consumed
+    # JSON media type only (no .diff/.patch); requests already negotiates gzip
+    headers = {"Accept": "application/vnd.github+json", "Accept-Encoding": "gzip"}
+    if GITHUB_TOKEN:
+        headers["Authorization"] = f"Bearer {GITHUB_TOKEN}"
+    else:
+        print("⚠️ No GITHUB_TOKEN set (config or environment); using unauthenticated requests. Private repositories will return 404.")
 
-def get_github_commits_between(repo, sha1, sha2):
-    """Get list of commits between two SHAs using gh CLI and show compare URL."""
-    compare_url = f"https://github.com/{repo}/compare/{sha1}...{sha2}"
-    print(f"\n🔗 GitHub Compare URL: {compare_url}")
-    print(f"Fetching commits between {sha1[:7]} and {sha2[:7]} from GitHub repo {repo}...")
+    url = f"https://api.github.com/repos/{repo}/compare/{sha1}...{sha2}"
+    params = {"per_page": 100}
+
+    # Follow Link rel="next"; the compare endpoint caps per_page at 100 commits
+    while url:
+        with _SESSION.get(url, headers=headers, params=params, timeout=60, stream=True) as response:
+            response.raise_for_status()
 
-    cmd = ["gh", "api", f"repos/{repo}/compare/{sha1}...{sha2}"]
-    
+            if ijson:
+                raw_commits = _iter_json_items(response, "commits.item")
+            else:
+                raw_commits = _json_loads(response.content).get("commits", [])
+
+            # Reduce each commit to the four fields we use as it arrives, rather than
+            # holding full commit payloads (tree, parents, verification...) for all pages
+            for c in raw_commits:
+                try:
+                    commit_info = {
+                        "sha": c["sha"][:7],
+                        "message": c["commit"]["message"],
+                        "author": c["commit"]["author"]["name"],
+                        "date": c["commit"]["author"]["date"]
+                    }
+                except KeyError as e:
+                    print(f"⚠️ Skipping malformed commit: missing field {e}")
+                    continue
+                yield commit_info
+
+            url = response.links.get("next", {}).get("url")
+            params = None  # the next URL already carries the query string
+
+
+def _read_compare_cache(path):
+    """Yield commits from a compare cache file (JSON lines after a schema header)."""
+    with open(path, "r", encoding="utf-8") as f:
+        next(f, None)  # skip the schema header
+        for line in f:
+            yield json.loads(line)
+
+
+def _write_through_compare_cache(path, commits):
+    """Yield commits while streaming them to a compare cache file."""
     try:
-        result = subprocess.run(cmd, capture_output=True, text=True, timeout=60)
-        if result.returncode != 0:
-            print(f"❌ GitHub API error: {result.stderr}")
-            return [], compare_url
-    except subprocess.TimeoutExpired:
-        print("❌ GitHub API request timed out")
-        return [], compare_url
-    except FileNotFoundError:
-        print("❌ GitHub CLI (gh) not found. Please install it first.")
-        return [], compare_url
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+    except OSError as e:
+        print(f"⚠️ Could not write cache {path}: {e}")
+        yield from commits
+        return
 
     try:
-        data = json.loads(result.stdout)
-    except json.JSONDecodeError as e:
-        print(f"❌ Invalid JSON response from GitHub API: {e}")
-        return [], compare_url
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(json.dumps({"schema_version": GITHUB_COMPARE_CACHE_SCHEMA_VERSION}) + "\n")
+            for c in commits:
+                f.write(json.dumps(c) + "\n")
+                yield c
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    # Only a fully consumed fetch replaces the cache entry; partial files are discarded above
+    try:
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"⚠️ Could not write cache {path}: {e}")
+        os.unlink(tmp_path)
+
+
+def _iter_github_commits(repo, sha1, sha2):
+    """Yield commits between two SHAs from the on-disk cache or the GitHub API."""
+    # A comparison between two fixed SHAs never changes, so results are cached per (repo, sha1, sha2)
+    cache_key = hashlib.sha1(f"{repo}|{sha1}|{sha2}".encode()).hexdigest()
+    cache_path = GITHUB_COMPARE_CACHE_DIR / f"{cache_key}.jsonl"
 
-    commits = data.get("commits", [])
-    print(f"🔍 Found {len(commits)} commits between {sha1[:7]} and {sha2[:7]}:\n")
+    try:
+        with open(cache_path, "r", encoding="utf-8") as f:
+            header = json.loads(f.readline())
+    except FileNotFoundError:
+        header = {}
+    except (OSError, ValueError) as e:
+        print(f"⚠️ Ignoring unreadable cache {cache_path}: {e}")
+        header = {}
+
+    if header.get("schema_version") == GITHUB_COMPARE_CACHE_SCHEMA_VERSION:
+        print(f"Using cached commits between {sha1[:7]} and {sha2[:7]} from GitHub repo {repo}...")
+        commits = _read_compare_cache(cache_path)
+    else:
+        print(f"Fetching commits between {sha1[:7]} and {sha2[:7]} from GitHub repo {repo}...")
+        commits = _write_through_compare_cache(cache_path, _fetch_github_commits(repo, sha1, sha2))
 
-    commit_list = []
+    print(f"🔍 Commits between {sha1[:7]} and {sha2[:7]}:\n")
+    count = 0
     for c in commits:
-        try:
-            commit_info = {
-                "sha": c["sha"][:7],
-                "message": c["commit"]["message"],
-                "author": c["commit"]["author"]["name"],
-                "date": c["commit"]["author"]["date"]
-            }
-            commit_list.append(commit_info)
-
-            msg_summary = commit_info["message"].split("\n")[0]
-            print(f"- {commit_info['sha']} | {commit_info['author']} | {commit_info['date']} | {msg_summary}")
-        except KeyError as e:
-            print(f"⚠️ Skipping malformed commit: missing field {e}")
-            continue
+        msg_summary = c["message"].split("\n", 1)[0]
+        print(f"- {c['sha']} | {c['author']} | {c['date']} | {msg_summary}")
+        count += 1
+        yield c
+    print(f"\n🔍 Found {count} commits between {sha1[:7]} and {sha2[:7]}")
 
-    return commit_list, compare_url
 
+def get_github_commits_between(repo, sha1, sha2):
+    """Get a lazy iterator of commits between two SHAs using the GitHub REST API and show compare URL."""
+    compare_url = f"https://github.com/{repo}/compare/{sha1}...{sha2}"
+    print(f"\n🔗 GitHub Compare URL: {compare_url}")
+    return _iter_github_commits(repo, sha1, sha2), compare_url
 
-def analyze_commits(commit_list, jira_base_url="https://landmarkinfo.atlassian.net/browse/"):
-    """Extract unique ticket references (3-5 letters + 2-6 digits) and return Jira links."""
-    pattern = re.compile(r"\b[a-zA-Z]{3,5}-\d{2,6}\b", re.IGNORECASE)
-    refs = set()
 
-    for c in commit_list:
-        try:
-            found = pattern.findall(c["message"])
-            refs.update([f.upper() for f in found])
-        except KeyError:
-            print("⚠️ Skipping commit with missing message field")
-            continue
+def find_ticket_refs(message):
+    """Return ticket references (3-5 letters + 2-6 digits) found in a commit message."""
+    # Every ticket reference contains a hyphen; skip the regex when there is none
+    if "-" not in message:
+        return []
+    return _TICKET_RE.findall(message.upper())
 
+
+def analyze_commits(refs, jira_base_url="https://landmarkinfo.atlassian.net/browse/"):
+    """Print unique ticket references and return their Jira links."""
     refs_list = sorted(refs)
 
     print("\n📝 Unique references with Jira links:")
@@ -154,45 +367,53 @@ def analyze_commits(commit_list, jira_base_url="https://landmarkinfo.atlassian.n
     return [f"{jira_base_url}{ref}" for ref in refs_list]
 
 
-def export_to_markdown(commit_list, refs_links, repo, compare_url, output_file="commit_report.md"):
+def format_commit_markdown(c, repo_commit_base, pr_repl):
+    """Format a commit as a Markdown list item with commit and PR links."""
+    sha = c["sha"]
+    msg_summary = c["message"].split("\n", 1)[0]
+    if "#" in msg_summary:
+        msg_summary = _PR_RE.sub(pr_repl, msg_summary)
+    return f"- [{sha}]({repo_commit_base}{sha}) | {c['author']} | {c['date']} | {msg_summary}\n"
+
+
+def export_to_markdown(commit_lines, refs_links, compare_url, output_file="commit_report.md"):
     """Export commits, ticket references, and compare URL to Markdown with timestamp."""
-    try:
-        with open(output_file, "w", encoding="utf-8") as f:
-            timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-            f.write(f"# Commit Report - {timestamp}\n\n")
-
-            # Add GitHub Compare URL at the top
-            f.write(f"**GitHub Compare URL:** [{compare_url}]({compare_url})\n\n")
-
-            # Section 1: GitHub commits
-            f.write("## GitHub Commits\n\n")
-            if commit_list:
-                for c in commit_list:
-                    try:
-                        sha_link = f"https://github.com/{repo}/commit/{c['sha']}"
-                        msg_summary = c["message"].split("\n")[0]
-                        pr_pattern = re.compile(r"#(\d+)")
-                        msg_summary_with_pr = pr_pattern.sub(
-                            lambda m: f"[#{m.group(1)}](https://github.com/{repo}/pull/{m.group(1)})",
-                            msg_summary
-                        )
-                        f.write(f"- [{c['sha']}]({sha_link}) | {c['author']} | {c['date']} | {msg_summary_with_pr}\n")
-                    except KeyError as e:
-                        print(f"⚠️ Skipping commit with missing field {e}")
-                        continue
-            else:
-                f.write("No commits found.\n")
+    timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
 
-            # Section 2: Ticket references
-            f.write("\n## Ticket References\n\n")
-            if refs_links:
-                for link in refs_links:
-                    f.write(f"- {link}\n")
-            else:
-                f.write("No ticket references found.\n")
+    # Assemble the whole report in memory and write it in one call
+    parts = [f"# Commit Report - {timestamp}\n\n"]
+
+    # Add GitHub Compare URL at the top
+    parts.append(f"**GitHub Compare URL:** [{compare_url}]({compare_url})\n\n")
+
+    # Section 1: GitHub commits
+    parts.append("## GitHub Commits\n\n")
+    if commit_lines:
+        parts.extend(commit_lines)
+    else:
+        parts.append("No commits found.\n")
+
+    # Section 2: Ticket references
+    parts.append("\n## Ticket References\n\n")
+    if refs_links:
+        for link in refs_links:
+            parts.append(f"- {link}\n")
+    else:
+        parts.append("No ticket references found.\n")
+
+    # Add timestamp as last line
+    parts.append(f"\n_Report generated on {timestamp}_\n")
+
+    buf = memoryview("".join(parts).encode("utf-8"))
 
-            # Add timestamp as last line
-            f.write(f"\n_Report generated on {timestamp}_\n")
+    try:
+        # Write the pre-encoded report straight to the fd, bypassing the text wrapper
+        fd = os.open(output_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, "O_BINARY", 0), 0o644)
+        try:
+            while buf:
+                buf = buf[os.write(fd, buf):]
+        finally:
+            os.close(fd)
 
         print(f"\n✅ Markdown file created: {output_file}")
     except IOError as e:
@@ -201,8 +422,8 @@ def export_to_markdown(commit_list, refs_links, repo, compare_url, output_file="
 
 def validate_build_number(build_number):
     """Validate build number format (x.y.z)"""
-    pattern = re.compile(r'^\d+\.\d+\.\d+$')
-    return bool(pattern.match(build_number))
+    parts = build_number.split(".")
+    return len(parts) == 3 and all(p.isdecimal() for p in parts)
 
 
 def main():
@@ -222,30 +443,47 @@ def main():
         if not validate_build_number(build_num):
             print(f"⚠️ Warning: Build number '{build_num}' doesn't match expected format (x.y.z)")
 
-    commit_shas = []
-    for build_num in [build1, build2]:
-        sha = get_azure_build_commit(ORG, PROJECT, DEFINITION_ID, BRANCH, build_num, AZURE_PAT)
-        if sha:
-            commit_shas.append(sha)
+    commit_shas = [sha for sha in get_azure_build_commits(ORG, PROJECT, DEFINITION_ID, BRANCH, [build1, build2], AZURE_PAT) if sha]
 
     if len(commit_shas) < 2:
         print("⚠️ Could not get two valid commit SHAs. Exiting.")
         sys.exit(1)
 
     sha1, sha2 = commit_shas
-    commit_list, compare_url = get_github_commits_between(GITHUB_REPO, sha1, sha2)
-    
-    if not commit_list:
-        print("⚠️ No commits found between the specified builds.")
-        return
-    
-    refs_links = analyze_commits(commit_list)
+    commits, compare_url = get_github_commits_between(GITHUB_REPO, sha1, sha2)
 
     # Generate Markdown filename based on config name + builds
     base_name = os.path.splitext(os.path.basename(config_file))[0]  # remove .json
     output_file = f"{base_name}_{build1}_{build2}_commit_report.md"
-    
-    export_to_markdown(commit_list, refs_links, GITHUB_REPO, compare_url, output_file=output_file)
+
+    repo_commit_base = f"https://github.com/{GITHUB_REPO}/commit/"
+    # Template replacement is expanded in C, with no Python callback per match
+    pr_repl = rf"[#\1](https://github.com/{GITHUB_REPO}/pull/\1)"
+
+    # Single pass: each commit is scanned for tickets and formatted as it streams in
+    refs = set()
+    commit_lines = []
+    try:
+        for c in commits:
+            try:
+                refs.update(find_ticket_refs(c["message"]))
+                commit_lines.append(format_commit_markdown(c, repo_commit_base, pr_repl))
+            except KeyError as e:
+                print(f"⚠️ Skipping commit with missing field {e}")
+                continue
+    except requests.exceptions.RequestException as e:
+        print(f"❌ GitHub API error: {e}")
+        return
+    except _JSON_ERRORS as e:
+        print(f"❌ Invalid JSON response from GitHub API: {e}")
+        return
+
+    if not commit_lines:
+        print("⚠️ No commits found between the specified builds.")
+        return
+
+    refs_links = analyze_commits(refs)
+    export_to_markdown(commit_lines, refs_links, compare_url, output_file=output_file)
 
 
 if __name__ == "__main__":